@@ -6,8 +6,18 @@ to avoid 403 blocks from Reddit on datacenter IPs.
 """
 
 import json
-from datetime import datetime
-from urllib.parse import urlencode, urlparse
+from datetime import datetime, timedelta
+from functools import lru_cache
+from operator import itemgetter
+from urllib.parse import urlencode
+
+# orjson parses response bytes directly; stdlib json accepts bytes as well
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 # about
 about = {
@@ -27,7 +37,35 @@ min_score = 3
 
 # PullPush API
 base_url = 'https://www.reddit.com'
-search_url = 'https://api.pullpush.io/reddit/submission/search?{query}'
+search_url = 'https://api.pullpush.io/reddit/submission/search?'
+
+
+# Post fields read by response(), with defaults for posts that lack some of them
+_POST_FIELDS = (
+    ('score', 0),
+    ('num_comments', 0),
+    ('permalink', ''),
+    ('title', ''),
+    ('thumbnail', ''),
+    ('url', None),
+    ('created_utc', 0),
+    ('selftext', ''),
+    ('subreddit', ''),
+)
+_get_post_fields = itemgetter(*(name for name, _default in _POST_FIELDS))
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=1024)
+def _ts_to_dt(ts):
+    """Convert a Reddit UTC timestamp to a naive UTC datetime (no tz lookup)."""
+    return _EPOCH + timedelta(seconds=ts)
+
+
+def _get_post_fields_slow(post):
+    """Fallback for _get_post_fields when a post is missing some keys."""
+    return tuple(post.get(name, default) for name, default in _POST_FIELDS)
 
 
 def request(query, params):
@@ -38,7 +76,7 @@ def request(query, params):
         'order': 'desc',
         'score': f'>{min_score}',
     })
-    params['url'] = search_url.format(query=query)
+    params['url'] = search_url + query
     return params
 
 
@@ -46,7 +84,7 @@ def response(resp):
     img_results = []
     text_results = []
 
-    search_results = json.loads(resp.text)
+    search_results = _loads(resp.content)
 
     if 'data' not in search_results:
         return []
@@ -54,49 +92,47 @@ def response(resp):
     posts = search_results.get('data', [])
 
     for post in posts:
+        try:
+            fields = _get_post_fields(post)
+        except KeyError:
+            fields = _get_post_fields_slow(post)
+        (score, num_comments, permalink, title, thumbnail, post_url,
+         created_utc, content, subreddit) = fields
+
         # Skip spam: low-score posts with zero engagement
-        score = post.get('score', 0)
-        num_comments = post.get('num_comments', 0)
         if score < 2 and num_comments == 0:
             continue
 
-        permalink = post.get('permalink', '')
         url = f'{base_url}{permalink}' if permalink else ''
-        title = post.get('title', '')
 
         if not url or not title:
             continue
 
         params = {'url': url, 'title': title}
 
-        thumbnail = post.get('thumbnail', '')
-        url_info = urlparse(thumbnail)
+        # Real thumbnails are absolute URLs; placeholders are 'self', 'default', 'nsfw', ...
+        thumbnail = thumbnail or ''
 
-        if url_info.netloc and url_info.path and thumbnail not in ('self', 'default', 'nsfw', 'spoiler', ''):
-            params['img_src'] = post.get('url', url)
+        if thumbnail.startswith(('http://', 'https://')):
+            params['img_src'] = url if post_url is None else post_url
             params['thumbnail_src'] = thumbnail
             params['template'] = 'images.html'
             img_results.append(params)
         else:
-            created_utc = post.get('created_utc', 0)
             if created_utc:
-                params['publishedDate'] = datetime.fromtimestamp(created_utc)
+                params['publishedDate'] = _ts_to_dt(created_utc)
 
-            content = post.get('selftext', '')
             if len(content) > 500:
                 content = content[:500] + '...'
             params['content'] = content
 
-            subreddit = post.get('subreddit', '')
-            score = post.get('score', 0)
-            num_comments = post.get('num_comments', 0)
             if subreddit:
-                metadata = f'r/{subreddit}'
+                parts = [f'r/{subreddit}']
                 if score:
-                    metadata += f' | {score} points'
+                    parts.append(f'{score} points')
                 if num_comments:
-                    metadata += f' | {num_comments} comments'
-                params['metadata'] = metadata
+                    parts.append(f'{num_comments} comments')
+                params['metadata'] = ' | '.join(parts)
 
             text_results.append(params)
 
@@ -3,18 +3,32 @@
 
 Uses Reddit's official OAuth API (oauth.reddit.com) for search.
 Requires client_id and client_secret from https://www.reddit.com/prefs/apps/
-Tokens are cached and auto-refreshed (1 hour TTL).
+Tokens are cached (1 hour TTL) and refreshed ahead of expiry by a background
+thread, so search requests don't wait on the token endpoint.
 
 Rate limits (OAuth): 1000 requests per 10 minutes (600 seconds).
-Engine tracks remaining quota from response headers and backs off when low.
+Engine paces requests with a token bucket that refills at the quota rate
+and is re-synced with the remaining quota reported in response headers.
 """
 
 import json
 import logging
+import threading
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
+from operator import itemgetter
 from urllib.parse import urlencode
-from urllib.request import Request, urlopen
+
+from searx import network
+
+# orjson parses response bytes directly; stdlib json accepts bytes as well
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +45,22 @@ about = {
 # engine dependent config
 categories = ["social media"]
 page_size = 25
+# Placeholder values Reddit puts in "thumbnail" when there is no image
+_THUMB_SENTINELS = frozenset(("self", "default", "nsfw", "spoiler", ""))
+
+# Post fields read by response(), with defaults for posts that lack some of them
+_POST_FIELDS = (
+    ("title", ""),
+    ("permalink", ""),
+    ("selftext", ""),
+    ("subreddit", ""),
+    ("score", 0),
+    ("num_comments", 0),
+    ("created_utc", 0),
+    ("thumbnail", ""),
+    ("url", None),
+)
+_get_post_fields = itemgetter(*(name for name, _default in _POST_FIELDS))
 
 # OAuth credentials — set from config.yaml engine entry
 client_id = ""
@@ -39,62 +69,144 @@ user_agent = "SearXNG:reddit_api:1.0 (by /u/searxng-adapter)"
 
 # Token cache
 _token = None
-_token_expires = 0
-
-# Rate limit tracking (from Reddit response headers)
+_token_expires = 0  # treat the token as stale after this (validity deadline)
+_token_refresh_at = 0  # background thread renews the token after this
+_TOKEN_EXPIRY_MARGIN = 60  # stop using a token this many seconds before expiry
+_TOKEN_REFRESH_MARGIN = 300  # refresh this many seconds before expiry
+_TOKEN_RETRY_DELAY = 60  # wait before retrying a failed background refresh
+_token_lock = threading.Lock()
+_refresher = None
+
+# Token bucket rate limiting
 # Reddit allows 1000 requests per 10 minutes
-_rate_remaining = 1000
-_rate_reset = 0  # timestamp when quota resets
-_RATE_SAFETY_FLOOR = 50  # stop sending when fewer than this remain
+_TB_CAP = 1000
+_TB_RATE = 1000 / 600  # tokens per second
+_tb_tokens = float(_TB_CAP)
+_tb_last = time.monotonic()
+_tb_not_before = 0.0  # quota exhausted: no requests until this monotonic time
+_tb_lock = threading.Lock()  # request() and response() run on different threads
+
+
+def _fetch_token():
+    """Request a new OAuth token using client_credentials grant. Caller holds _token_lock."""
+    global _token, _token_expires, _token_refresh_at
+
+    # searx.network reuses SearXNG's pooled httpx client (keep-alive, TLS reuse)
+    resp = network.post(
+        "https://www.reddit.com/api/v1/access_token",
+        data={"grant_type": "client_credentials"},
+        auth=(client_id, client_secret),
+        headers={"User-Agent": user_agent},
+        timeout=10,
+    )
+    resp.raise_for_status()
+    data = _loads(resp.content)
+
+    now = time.time()
+    expires_in = data.get("expires_in", 3600)
+    _token = data["access_token"]
+    _token_expires = now + expires_in - _TOKEN_EXPIRY_MARGIN
+    _token_refresh_at = now + expires_in - _TOKEN_REFRESH_MARGIN
+
+
+def _refresh_loop():
+    """Keep the cached token fresh so request() never refreshes inline."""
+    while True:
+        time.sleep(max(_token_refresh_at - time.time(), 0))
+        try:
+            with _token_lock:
+                # _get_token() may have fetched a new token while we slept
+                if time.time() >= _token_refresh_at:
+                    _fetch_token()
+        except Exception as e:
+            logger.warning("Reddit API token refresh failed: %s", e)
+            time.sleep(_TOKEN_RETRY_DELAY)
 
 
 def _get_token():
-    """Get OAuth token using client_credentials grant. Cached for ~59 minutes."""
-    global _token, _token_expires
+    """Return the cached OAuth token, fetching it on first use."""
+    global _refresher
 
     if _token and time.time() < _token_expires:
         return _token
 
-    import base64
+    with _token_lock:
+        # Another worker may have refreshed while we waited for the lock
+        if not (_token and time.time() < _token_expires):
+            _fetch_token()
+        if _refresher is None:
+            _refresher = threading.Thread(
+                target=_refresh_loop, name="reddit-api-token", daemon=True
+            )
+            _refresher.start()
+        return _token
 
-    credentials = base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
-    req = Request(
-        "https://www.reddit.com/api/v1/access_token",
-        data=b"grant_type=client_credentials",
-        headers={
-            "Authorization": f"Basic {credentials}",
-            "User-Agent": user_agent,
-            "Content-Type": "application/x-www-form-urlencoded",
-        },
-        method="POST",
-    )
-    with urlopen(req, timeout=10) as resp:
-        data = json.loads(resp.read())
 
-    _token = data["access_token"]
-    _token_expires = time.time() + data.get("expires_in", 3600) - 60
-    return _token
+def _acquire():
+    """Take one token from the bucket. Returns False when the quota is exhausted."""
+    global _tb_tokens, _tb_last
+
+    with _tb_lock:
+        now = time.monotonic()
+        if now < _tb_not_before:
+            logger.warning(
+                "Reddit API rate limit: quota exhausted, resets in %.0fs",
+                _tb_not_before - now,
+            )
+            return False
+        _tb_tokens = min(_TB_CAP, _tb_tokens + (now - _tb_last) * _TB_RATE)
+        _tb_last = now
+        if _tb_tokens >= 1:
+            _tb_tokens -= 1
+            return True
+    logger.warning("Reddit API rate limit: token bucket empty, skipping request")
+    return False
 
 
-def _is_rate_limited():
-    """Check if we should back off to protect the quota."""
-    now = time.time()
-    # If reset time has passed, quota is refreshed
-    if now > _rate_reset:
-        return False
-    if _rate_remaining < _RATE_SAFETY_FLOOR:
-        wait = int(_rate_reset - now)
-        logger.warning(
-            f"Reddit API rate limit: {_rate_remaining} remaining, "
-            f"backing off for {wait}s until reset"
-        )
-        return True
-    return False
+def _sync_rate_limit(headers):
+    """Sync the token bucket with the quota Reddit reports in response headers."""
+    global _tb_tokens, _tb_last, _tb_not_before
+
+    try:
+        remaining = headers.get("x-ratelimit-remaining")
+        reset = headers.get("x-ratelimit-reset")
+        used = headers.get("x-ratelimit-used")
+        if used is not None:
+            logger.debug("Reddit API: used=%s, remaining=%s, reset_in=%ss", used, remaining, reset)
+        if remaining is None:
+            return
+        remaining = float(remaining)
+        reset = float(reset) if reset is not None else None
+    except (ValueError, TypeError):
+        return
+
+    with _tb_lock:
+        now = time.monotonic()
+        _tb_tokens = min(_TB_CAP, remaining)
+        _tb_last = now
+        # Refilling at the average rate would let requests through before the
+        # window actually resets; hold them until the reported reset instead
+        if remaining < 1 and reset is not None:
+            _tb_not_before = now + reset
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+@lru_cache(maxsize=1024)
+def _ts_to_dt(ts):
+    """Convert a Reddit UTC timestamp to a naive UTC datetime (no tz lookup)."""
+    return _EPOCH + timedelta(seconds=ts)
+
+
+def _get_post_fields_slow(post):
+    """Fallback for _get_post_fields when a post is missing some keys."""
+    return tuple(post.get(name, default) for name, default in _POST_FIELDS)
 
 
 def request(query, params):
-    # Back off if close to rate limit
-    if _is_rate_limited():
+    # Back off when the token bucket is empty
+    if not _acquire():
         return None
 
     token = _get_token()
@@ -117,79 +229,63 @@ def request(query, params):
 
 
 def response(resp):
-    global _rate_remaining, _rate_reset
-
-    # Update rate limit tracking from response headers
-    try:
-        remaining = resp.headers.get("x-ratelimit-remaining")
-        reset = resp.headers.get("x-ratelimit-reset")
-        used = resp.headers.get("x-ratelimit-used")
-        if remaining is not None:
-            _rate_remaining = int(float(remaining))
-        if reset is not None:
-            _rate_reset = time.time() + int(float(reset))
-        if used is not None:
-            logger.debug(f"Reddit API: used={used}, remaining={_rate_remaining}, reset_in={reset}s")
-    except (ValueError, TypeError):
-        pass
+    _sync_rate_limit(resp.headers)
 
     results = []
 
     try:
-        data = json.loads(resp.text)
-    except (json.JSONDecodeError, AttributeError):
+        data = _loads(resp.content)
+    except (ValueError, AttributeError):
         return results
 
     listing = data.get("data", {})
     children = listing.get("children", [])
 
+    # Bind hot lookups to locals once for the whole page
+    append = results.append
+    ts_to_dt = _ts_to_dt
+    thumb_sentinels = _THUMB_SENTINELS
+    get_post_fields = _get_post_fields
+
     for child in children:
         post = child.get("data", {})
+        try:
+            fields = get_post_fields(post)
+        except KeyError:
+            fields = _get_post_fields_slow(post)
+        (title, permalink, content, subreddit, score, num_comments,
+         created_utc, thumbnail, post_url) = fields
 
-        title = post.get("title", "")
-        permalink = post.get("permalink", "")
         if not title or not permalink:
             continue
 
         url = f"https://www.reddit.com{permalink}"
 
         # Build content from selftext
-        content = post.get("selftext", "")
         if len(content) > 500:
             content = content[:500] + "..."
 
-        # Metadata
-        subreddit = post.get("subreddit", "")
-        score = post.get("score", 0)
-        num_comments = post.get("num_comments", 0)
-
-        result = {
-            "url": url,
-            "title": title,
-            "content": content,
-        }
+        result = {"url": url, "title": title, "content": content}
 
         # Published date
-        created_utc = post.get("created_utc", 0)
         if created_utc:
-            result["publishedDate"] = datetime.fromtimestamp(created_utc)
+            result["publishedDate"] = ts_to_dt(created_utc)
 
         # Metadata line
         if subreddit:
-            metadata = f"r/{subreddit}"
+            parts = [f"r/{subreddit}"]
             if score:
-                metadata += f" | {score} points"
+                parts.append(f"{score} points")
             if num_comments:
-                metadata += f" | {num_comments} comments"
-            result["metadata"] = metadata
+                parts.append(f"{num_comments} comments")
+            result["metadata"] = " | ".join(parts)
 
         # Thumbnail handling
-        thumbnail = post.get("thumbnail", "")
-        if thumbnail and thumbnail not in ("self", "default", "nsfw", "spoiler", ""):
-            result["img_src"] = post.get("url", url)
+        if thumbnail and thumbnail not in thumb_sentinels:
+            result["img_src"] = url if post_url is None else post_url
             result["thumbnail_src"] = thumbnail
             result["template"] = "images.html"
 
-        results.append(result)
+        append(result)
 
     return results
@@ -4,8 +4,17 @@ Queries the solograph-search HTTP API (search_server.py).
 Generic engine: configure source_name per engine instance in config.yaml.
 """
 
+import json
 from urllib.parse import urlencode
 
+# orjson parses response bytes directly; stdlib json accepts bytes as well
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 about = {
     "website": "https://github.com/fortunto2/solograph",
     "use_official_api": False,
@@ -31,7 +40,7 @@ def request(query, params):
 
 def response(resp):
     results = []
-    data = resp.json()
+    data = _loads(resp.content)
 
     for item in data.get("results", []):
         title = item.get("title", "")
@@ -72,6 +72,39 @@ class Config:
             .get("max_content_length", 2500)
         )
 
+    @property
+    def scraper_max_bytes(self) -> int:
+        return int(
+            os.getenv(
+                "SCRAPER_MAX_BYTES",
+                self._config.get("adapter", {})
+                .get("scraper", {})
+                .get("max_bytes", 2 * 1024 * 1024),
+            )
+        )
+
+    @property
+    def scraper_max_concurrency(self) -> int:
+        return int(
+            os.getenv(
+                "SCRAPER_MAX_CONCURRENCY",
+                self._config.get("adapter", {})
+                .get("scraper", {})
+                .get("max_concurrency", 16),
+            )
+        )
+
+    @property
+    def scraper_max_per_host(self) -> int:
+        return int(
+            os.getenv(
+                "SCRAPER_MAX_PER_HOST",
+                self._config.get("adapter", {})
+                .get("scraper", {})
+                .get("max_per_host", 8),
+            )
+        )
+
     @property
     def scraper_user_agent(self) -> str:
         return (
@@ -96,6 +129,60 @@ class Config:
             .get("default_engines", "google,duckduckgo")
         )
 
+    @property
+    def response_cache_ttl(self) -> int:
+        return int(
+            os.getenv(
+                "RESPONSE_CACHE_TTL",
+                self._config.get("adapter", {}).get("cache", {}).get("response_ttl", 300),
+            )
+        )
+
+    @property
+    def response_cache_size(self) -> int:
+        return int(
+            os.getenv(
+                "RESPONSE_CACHE_SIZE",
+                self._config.get("adapter", {}).get("cache", {}).get("response_size", 1024),
+            )
+        )
+
+    @property
+    def search_cache_ttl(self) -> int:
+        return int(
+            os.getenv(
+                "SEARCH_CACHE_TTL",
+                self._config.get("adapter", {}).get("cache", {}).get("search_ttl", 600),
+            )
+        )
+
+    @property
+    def search_cache_size(self) -> int:
+        return int(
+            os.getenv(
+                "SEARCH_CACHE_SIZE",
+                self._config.get("adapter", {}).get("cache", {}).get("search_size", 1024),
+            )
+        )
+
+    @property
+    def scrape_cache_ttl(self) -> int:
+        return int(
+            os.getenv(
+                "SCRAPE_CACHE_TTL",
+                self._config.get("adapter", {}).get("cache", {}).get("scrape_ttl", 3600),
+            )
+        )
+
+    @property
+    def scrape_cache_size(self) -> int:
+        return int(
+            os.getenv(
+                "SCRAPE_CACHE_SIZE",
+                self._config.get("adapter", {}).get("cache", {}).get("scrape_size", 2048),
+            )
+        )
+
 
 # Глобальный экземпляр конфига
 config = Config()
@@ -13,6 +13,14 @@ Engine groups:
 - NEWS: recent events, launches, trends
 """
 
+import re
+from functools import lru_cache
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # Engine groups — all must be enabled in SearXNG config
 # Independent indexes (mojeek, stract, marginalia) added for diversity.
 ENGINES_GENERAL = "google,duckduckgo,brave,mojeek"
@@ -71,6 +79,43 @@ _CATEGORIES = {
     "news": (_NEWS_KW, ENGINES_NEWS),
     "ai": (_AI_KW, ENGINES_AI),
 }
+_CATS_LIST = list(_CATEGORIES.items())
+
+
+def _build_automaton():
+    """Build one Aho-Corasick automaton over the keywords of every category."""
+    automaton = ahocorasick.Automaton()
+    for cat_idx, (_cat, (keywords, _engines)) in enumerate(_CATS_LIST):
+        for kw in keywords:
+            automaton.add_word(kw, (cat_idx, kw))
+    automaton.make_automaton()
+    return automaton
+
+
+def _build_category_regexes():
+    """Compile one alternation per category, used when pyahocorasick is absent.
+
+    The lookahead finds a match at every position, and longer keywords are
+    tried first. A keyword hidden behind a longer one at the same position
+    (e.g. "swift" in "swiftui") is recovered via the ``contained`` map, so
+    scores stay identical to plain substring counting.
+    """
+    compiled = []
+    for _cat, (keywords, _engines) in _CATS_LIST:
+        alternation = "|".join(
+            re.escape(kw) for kw in sorted(keywords, key=len, reverse=True)
+        )
+        pattern = re.compile(f"(?=({alternation}))", re.IGNORECASE)
+        contained = {
+            kw: frozenset(other for other in keywords if other in kw)
+            for kw in keywords
+        }
+        compiled.append((pattern, contained))
+    return compiled
+
+
+_AC = _build_automaton() if ahocorasick is not None else None
+_CAT_RE = _build_category_regexes() if _AC is None else None
 
 
 # Engine → SearXNG categories mapping
@@ -109,19 +154,52 @@ ENGINE_CATEGORIES: dict[str, str] = {
 }
 
 
+# One bit per distinct category (in sorted order), so a set of categories is an int
+_CATEGORY_BITS: dict[str, int] = {
+    cat: 1 << i for i, cat in enumerate(sorted(set(ENGINE_CATEGORIES.values())))
+}
+_ENGINE_BITS: dict[str, int] = {
+    engine: _CATEGORY_BITS[cat] for engine, cat in ENGINE_CATEGORIES.items()
+}
+_MASK_TO_CATEGORIES: dict[int, str] = {
+    mask: ",".join(cat for cat, bit in _CATEGORY_BITS.items() if mask & bit) or "general"
+    for mask in range(1 << len(_CATEGORY_BITS))
+}
+
+
+@lru_cache(maxsize=256)
+def _categories_for_engines(engines: str) -> str:
+    mask = 0
+    for engine in engines.split(","):
+        mask |= _ENGINE_BITS.get(engine.strip(), 0)
+    return _MASK_TO_CATEGORIES[mask]
+
+
+# Categories for the built-in engine groups, resolved once at import
+_PRECOMPUTED_CATEGORIES: dict[str, str] = {
+    engines: _categories_for_engines.__wrapped__(engines)
+    for engines in (
+        ENGINES_GENERAL,
+        ENGINES_ACADEMIC,
+        ENGINES_TECH,
+        ENGINES_PRODUCT,
+        ENGINES_REFERENCE,
+        ENGINES_NEWS,
+        ENGINES_AI,
+    )
+}
+
+
 def get_categories_for_engines(engines: str) -> str:
     """Return comma-separated SearXNG categories needed for the given engines.
 
     SearXNG requires matching categories — e.g. reddit needs 'social media',
     github needs 'it'. Without the right category, the engine returns 0 results.
     """
-    cats: set[str] = set()
-    for engine in engines.split(","):
-        engine = engine.strip()
-        cat = ENGINE_CATEGORIES.get(engine)
-        if cat:
-            cats.add(cat)
-    return ",".join(sorted(cats)) if cats else "general"
+    cats = _PRECOMPUTED_CATEGORIES.get(engines)
+    if cats is None:
+        cats = _categories_for_engines(engines)
+    return cats
 
 
 def get_smart_engines(query: str) -> str:
@@ -130,18 +208,43 @@ def get_smart_engines(query: str) -> str:
     Scores each category by counting keyword matches.
     Returns ENGINES_GENERAL if no category has any matches.
     """
-    q = query.lower()
-
-    best_cat = None
+    # Normalize so case and spacing variants of a query share one cache entry
+    return _smart_engines_cached(" ".join(query.lower().split()))
+
+
+def _category_scores(norm_query: str) -> list[int]:
+    """Count distinct keywords of each category (in _CATS_LIST order) found in the query."""
+    if _AC is not None:
+        # Single pass over the query; a keyword counts once however often it occurs
+        scores = [0] * len(_CATS_LIST)
+        seen: set[str] = set()
+        for _end, (cat_idx, kw) in _AC.iter(norm_query):
+            if kw not in seen:
+                seen.add(kw)
+                scores[cat_idx] += 1
+    else:
+        scores = []
+        for pattern, contained in _CAT_RE:
+            matched: set[str] = set()
+            for m in pattern.findall(norm_query):
+                kw = m.lower()
+                matched.update(contained.get(kw, (kw,)))
+            scores.append(len(matched))
+    return scores
+
+
+@lru_cache(maxsize=4096)
+def _smart_engines_cached(norm_query: str) -> str:
+    scores = _category_scores(norm_query)
+    best_idx = None
     best_score = 0
 
-    for cat, (keywords, _engines) in _CATEGORIES.items():
-        score = sum(1 for kw in keywords if kw in q)
+    for cat_idx, score in enumerate(scores):
         if score > best_score:
             best_score = score
-            best_cat = cat
+            best_idx = cat_idx
 
-    if best_score == 0 or best_cat is None:
+    if best_score == 0 or best_idx is None:
         return ENGINES_GENERAL
 
-    return _CATEGORIES[best_cat][1]
+    return _CATS_LIST[best_idx][1][1]
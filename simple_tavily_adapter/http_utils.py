@@ -0,0 +1,41 @@
+"""
+Вспомогательные функции для HTTP-ответов
+"""
+
+import codecs
+
+import aiohttp
+
+# Размер куска при потоковом чтении тела ответа
+_READ_CHUNK_SIZE = 65536
+
+
+def resolve_charset(charset: str | None) -> str:
+    """Кодек для charset из Content-Type; неизвестные метки заменяются на utf-8"""
+    if charset:
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+async def read_capped_text(
+    response: aiohttp.ClientResponse, max_bytes: int
+) -> str | None:
+    """Читает тело ответа как текст, не больше max_bytes байт.
+
+    Если Content-Length больше лимита, страница пропускается (None), иначе
+    тело читается потоком и обрезается на лимите. Кодировка берется из
+    Content-Type, без угадывания по содержимому.
+    """
+    content_length = response.content_length
+    if content_length is not None and content_length > max_bytes:
+        return None
+
+    raw = bytearray()
+    async for chunk in response.content.iter_chunked(_READ_CHUNK_SIZE):
+        raw.extend(chunk)
+        if len(raw) >= max_bytes:
+            break
+    return raw[:max_bytes].decode(resolve_charset(response.charset), errors="replace")
@@ -6,21 +6,38 @@ import asyncio
 import logging
 import os
 import random
+import re
+import secrets
+import threading
 import time
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from typing import Any, Literal
+from urllib.parse import urlsplit
 
 import aiohttp
+import lxml.html
 import nh3
+import orjson
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
-from markdownify import markdownify as md
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from lxml import etree
+from markdownify import MarkdownConverter
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    from youtube_transcript_api import YouTubeTranscriptApi
+except ImportError:
+    YouTubeTranscriptApi = None
 
 from tavily_client import TavilyResponse, TavilyResult
+from cache import KeyedSemaphore, SingleFlight, TTLCache
 from config_loader import config
 from engine_selector import get_smart_engines
+from http_utils import read_capped_text
 
 # Загружаем переменные окружения
 load_dotenv()
@@ -29,8 +46,8 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-logger.info(f"Using search server: {config.searxng_url}")
-logger.info(f"Server will run on: {config.server_host}:{config.server_port}")
+logger.info("Using search server: %s", config.searxng_url)
+logger.info("Server will run on: %s:%s", config.server_host, config.server_port)
 
 # Список User-Agent'ов для ротации (Chrome 131, Firefox 134, Safari 18 — 2025)
 USER_AGENTS = [
@@ -51,9 +68,158 @@ ENGINE_FALLBACKS = [
     "google,duckduckgo,wikipedia,wikidata", # Retry: reference-heavy
 ]
 
+# Неизменяемая часть запроса к SearXNG; q и engines добавляются на каждый запрос
+_SEARXNG_BASE_PARAMS = {
+    "format": "json",
+    "pageno": 1,
+    "language": "auto",
+    "safesearch": 1,
+}
+_SEARXNG_TIMEOUT = aiohttp.ClientTimeout(total=30)
+
+# Статичные заголовки для retry-поиска; User-Agent и IP рандомизируются на попытку
+_RETRY_BASE_HEADERS = {
+    "Content-Type": "application/x-www-form-urlencoded",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "DNT": "1",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+}
+
+# Заголовки простого поиска без anti-captcha (не меняются между запросами)
+_SIMPLE_SEARCH_HEADERS = {
+    "X-Forwarded-For": "127.0.0.1",
+    "X-Real-IP": "127.0.0.1",
+    "User-Agent": "Mozilla/5.0 (compatible; TavilyBot/1.0)",
+    "Content-Type": "application/x-www-form-urlencoded",
+    "Accept-Encoding": "gzip, deflate, br",
+}
+
+# Заголовки скрапера; User-Agent выбирается случайно на каждый запрос
+_SCRAPE_BASE_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "DNT": "1",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "none",
+    "Sec-Fetch-User": "?1",
+    "Cache-Control": "max-age=0",
+}
+_SCRAPE_TIMEOUT = aiohttp.ClientTimeout(total=config.scraper_timeout)
+
+# Сколько попыток SearXNG может выполняться одновременно в hedged режиме
+_HEDGE_MAX_IN_FLIGHT = 2
+
+# Конвертер переиспользует уже разобранное дерево, без повторного парсинга HTML
+_md_converter = MarkdownConverter(heading_style="ATX", strip=["script", "style"])
+
+# Кэш готовых ответов /search (без request_id и response_time)
+response_cache = TTLCache(
+    maxsize=config.response_cache_size, ttl=config.response_cache_ttl
+)
+# Одинаковые одновременные запросы получают результат первого, а не ищут заново
+_search_flight = SingleFlight()
+# Кэш ответов SearXNG: (query, engines) -> JSON ответа
+search_cache = TTLCache(maxsize=config.search_cache_size, ttl=config.search_cache_ttl)
+# Кэш скрапинга: (url, content_format) -> очищенный контент
+scrape_cache = TTLCache(maxsize=config.scrape_cache_size, ttl=config.scrape_cache_ttl)
+_scrape_flight = SingleFlight()
+# Ограничиваем число одновременных скрапов, чтобы не забивать DNS/TCP/TLS
+_scrape_semaphore = asyncio.Semaphore(config.scraper_max_concurrency)
+# Лимит на один хост берется до общего слота и до старта таймаута запроса:
+# очередь к медленному хосту не тратит время таймаута и не держит общие слоты
+_scrape_host_limit = KeyedSemaphore(config.scraper_max_per_host)
+
+# Разрешенные nh3 теги и атрибуты при очистке HTML
+_NH3_TAGS = frozenset({
+    "p", "div", "span", "a", "img",
+    "h1", "h2", "h3", "h4", "h5", "h6",
+    "ul", "ol", "li",
+    "strong", "em", "b", "i", "br",
+    "blockquote", "pre", "code",
+    "table", "tr", "td", "th", "thead", "tbody",
+})
+_NH3_ATTRIBUTES = {
+    "a": frozenset({"href"}),
+    "img": frozenset({"src", "alt"}),
+    "*": frozenset({"class", "id"}),
+}
+
+# Элементы, которые удаляются вместе с содержимым при скрапинге
+_DROP_TAGS = ("script", "style", "nav", "header", "footer", "aside", "iframe")
+_NH3_CLEAN_CONTENT_TAGS = frozenset(_DROP_TAGS)
+
+# Текст уже декодирован, поэтому lxml не должен искать кодировку в <meta>/<?xml?>.
+# Парсер lxml держит блокировку на время разбора, поэтому у каждого потока
+# parse_executor свой экземпляр - иначе разборы идут строго по одному
+_parser_local = threading.local()
+
+
+def _utf8_html_parser() -> lxml.html.HTMLParser:
+    """HTML-парсер с фиксированной кодировкой utf-8 для текущего потока"""
+    parser = getattr(_parser_local, "parser", None)
+    if parser is None:
+        parser = _parser_local.parser = lxml.html.HTMLParser(encoding="utf-8")
+    return parser
+
+
+# ID видео из ссылок youtube.com/watch?v=... и youtu.be/...
+_YOUTUBE_ID_RE = re.compile(r"(?:v=|youtu\.be/)([a-zA-Z0-9_-]{11})")
+
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Общие HTTP-сессии на всё время жизни приложения (keep-alive, DNS-кэш)"""
+    app.state.searxng_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=100, limit_per_host=32, ttl_dns_cache=300, keepalive_timeout=75
+        )
+    )
+    # Скрапинг ходит на много разных хостов: больше общий пул, асинхронный DNS
+    app.state.scrape_session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            # Лимит на хост держит _scrape_host_limit: ожидание свободного
+            # соединения в пуле aiohttp засчитывается в total-таймаут
+            limit=256,
+            use_dns_cache=True,
+            ttl_dns_cache=600,
+            resolver=aiohttp.AsyncResolver(),
+        )
+    )
+    # Свой пул потоков для разбора HTML, чтобы скрапинг не занимал
+    # дефолтный executor, которым пользуются зависимости и sync-роуты FastAPI
+    app.state.parse_executor = ThreadPoolExecutor(
+        max_workers=os.cpu_count(), thread_name_prefix="html-parse"
+    )
+    try:
+        yield
+    finally:
+        await app.state.searxng_session.close()
+        await app.state.scrape_session.close()
+        app.state.parse_executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(
+    title="SearXNG Tavily Adapter",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 
-app = FastAPI(title="SearXNG Tavily Adapter", version="1.0.0")
+# Сериализация списка результатов целиком в pydantic-core, без model_dump на каждый
+_results_adapter = TypeAdapter(list[TavilyResult])
 
 
 class SearchRequest(BaseModel):
@@ -64,94 +230,110 @@ class SearchRequest(BaseModel):
     engines: str | None = None  # Пользовательский выбор движков (например: "google,wikipedia")
 
 
+def _extract_capped(tree: lxml.html.HtmlElement, cap: int) -> str:
+    """Собирает текст дерева, пока не наберется чуть больше cap символов"""
+    chunks = []
+    total = -1
+    for t in tree.itertext():
+        chunk = t.strip()
+        if not chunk:
+            continue
+        chunks.append(chunk)
+        total += len(chunk) + 1
+        # Дальше все равно обрежем, остаток документа не нужен
+        if total > cap:
+            break
+    return " ".join(chunks)
+
+
+def _extract_content(html: str, content_format: str) -> str | None:
+    """Очищает HTML и извлекает текст или Markdown (CPU-работа, вызывается в потоке)"""
+    if content_format == "markdown":
+        # Очищаем HTML с помощью nh3 для безопасности. Ненужные элементы
+        # (script, nav, footer, ...) удаляются вместе с содержимым за тот же проход
+        clean_html = nh3.clean(
+            html,
+            tags=_NH3_TAGS,
+            clean_content_tags=_NH3_CLEAN_CONTENT_TAGS,
+            attributes=_NH3_ATTRIBUTES,
+        )
+        # Конвертируем в Markdown
+        soup = BeautifulSoup(clean_html, "lxml")
+        text = _md_converter.convert_soup(soup)
+    else:
+        # Для простого текста теги все равно отбрасываются, поэтому nh3 не нужен:
+        # lxml сам разбирает грязный HTML, ненужные элементы вырезаем из дерева
+        try:
+            tree = lxml.html.fromstring(
+                html.encode("utf-8"), parser=_utf8_html_parser()
+            )
+        except etree.ParserError:
+            # Пустой документ (нет ни одного элемента)
+            return None
+        etree.strip_elements(tree, *_DROP_TAGS, with_tail=False)
+        text = _extract_capped(tree, config.scraper_max_length)
+
+    # Обрезаем до настроенного размера
+    if len(text) > config.scraper_max_length:
+        text = text[: config.scraper_max_length] + "..."
+
+    # Страница без текста - None в обоих форматах, как и при ошибке скрапинга
+    return text or None
+
+
 async def fetch_raw_content(
     session: aiohttp.ClientSession, url: str, content_format: str = "text"
 ) -> str | None:
     """Скрапит страницу и возвращает контент в указанном формате"""
+    cache_key = (url, content_format)
+    cached = scrape_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    async def _scrape_and_cache() -> str | None:
+        # Сначала лимит на хост, затем общий на весь процесс; попадания в кэш их не тратят
+        async with _scrape_host_limit.hold(urlsplit(url).hostname), _scrape_semaphore:
+            text = await _scrape_page(session, url, content_format)
+        if text:
+            scrape_cache.set(cache_key, text)
+        return text
+
+    # Параллельные запросы одной страницы получают результат одного скрапа
+    return await _scrape_flight.do(cache_key, _scrape_and_cache)
+
+
+async def _scrape_page(
+    session: aiohttp.ClientSession, url: str, content_format: str
+) -> str | None:
+    """Скачивает страницу и извлекает из нее контент, без кэша"""
     try:
         scrape_headers = {
             "User-Agent": random.choice(USER_AGENTS),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept-Encoding": "gzip, deflate, br",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "none",
-            "Sec-Fetch-User": "?1",
-            "Cache-Control": "max-age=0",
+            **_SCRAPE_BASE_HEADERS,
         }
         async with session.get(
             url,
-            timeout=aiohttp.ClientTimeout(total=config.scraper_timeout),
+            timeout=_SCRAPE_TIMEOUT,
             headers=scrape_headers,
             allow_redirects=True,
         ) as response:
             if response.status != 200:
                 return None
 
-            html = await response.text()
-
-            # Очищаем HTML с помощью nh3 для безопасности
-            clean_html = nh3.clean(
-                html,
-                tags={
-                    "p",
-                    "div",
-                    "span",
-                    "a",
-                    "img",
-                    "h1",
-                    "h2",
-                    "h3",
-                    "h4",
-                    "h5",
-                    "h6",
-                    "ul",
-                    "ol",
-                    "li",
-                    "strong",
-                    "em",
-                    "b",
-                    "i",
-                    "br",
-                    "blockquote",
-                    "pre",
-                    "code",
-                    "table",
-                    "tr",
-                    "td",
-                    "th",
-                    "thead",
-                    "tbody",
-                },
-                attributes={"a": {"href"}, "img": {"src", "alt"}, "*": {"class", "id"}},
-            )
-
-            soup = BeautifulSoup(clean_html, "html.parser")
-
-            # Удаляем ненужные элементы
-            for tag in soup(
-                ["script", "style", "nav", "header", "footer", "aside", "iframe"]
-            ):
-                tag.decompose()
-
-            if content_format == "markdown":
-                # Конвертируем в Markdown
-                text = md(str(soup), heading_style="ATX", strip=["script", "style"])
-            else:
-                # Берем простой текст
-                text = soup.get_text(separator=" ", strip=True)
-
-            # Обрезаем до настроенного размера
-            if len(text) > config.scraper_max_length:
-                text = text[: config.scraper_max_length] + "..."
+            # Не тянем целиком огромные страницы
+            html = await read_capped_text(response, config.scraper_max_bytes)
+            if html is None:
+                return None
 
-            return text
+        # Парсинг и очистка - CPU-работа, уносим ее из event loop
+        # (соединение к этому моменту уже вернулось в пул). Вне lifespan
+        # пула нет - тогда используется дефолтный executor
+        executor = getattr(app.state, "parse_executor", None)
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, _extract_content, html, content_format
+        )
     except Exception as e:
-        logger.warning(f"Error fetching content from {url}: {e}")
+        logger.warning("Error fetching content from %s: %s", url, e)
         return None
 
 
@@ -174,7 +356,8 @@ def _trim_query_for_github(query: str, engines: str | None) -> str:
     GitHub search API returns 0 results for queries with 4+ words.
     We strip stop words and keep the most specific terms.
     """
-    if not engines:
+    # Быстрый выход без разбора строки, если github точно не упомянут
+    if not engines or "github" not in engines:
         return query
     engine_list = [e.strip() for e in engines.split(",")]
     if "github" not in engine_list:
@@ -189,7 +372,7 @@ def _trim_query_for_github(query: str, engines: str | None) -> str:
         keywords = words[:_GITHUB_MAX_WORDS]
     trimmed = " ".join(keywords[:_GITHUB_MAX_WORDS])
     if trimmed != query:
-        logger.info(f"GitHub query trimmed: '{query}' -> '{trimmed}'")
+        logger.info("GitHub query trimmed: '%s' -> '%s'", query, trimmed)
     return trimmed
 
 
@@ -199,7 +382,8 @@ def _rewrite_reddit_engines(query: str, engines: str | None) -> tuple[str, str |
     When user requests 'reddit', we add 'reddit_api' (OAuth) alongside it.
     Also add Google site:reddit.com as extra source for better coverage.
     """
-    if not engines:
+    # Быстрый выход без разбора строки, если reddit точно не упомянут
+    if not engines or "reddit" not in engines:
         return query, engines
     engine_list = [e.strip() for e in engines.split(",")]
     if "reddit" not in engine_list:
@@ -215,105 +399,163 @@ def _rewrite_reddit_engines(query: str, engines: str | None) -> tuple[str, str |
     return query, ",".join(engine_list)
 
 
+async def _search_attempt(
+    session: aiohttp.ClientSession,
+    query: str,
+    attempt: int,
+    max_retries: int,
+    user_engines: str | None = None,
+) -> dict | None:
+    """Одна попытка поиска в SearXNG, возвращает данные или None при неудаче"""
+
+    # Выбираем движки для текущей попытки
+    if user_engines:
+        # Пользователь указал движки - используем их для всех попыток
+        engines = user_engines
+    elif attempt == 0:
+        # Первая попытка - умный выбор на основе запроса
+        engines = get_smart_engines(query)
+    else:
+        # Последующие попытки - используем fallback список
+        engines = ENGINE_FALLBACKS[(attempt - 1) % len(ENGINE_FALLBACKS)]
+
+    user_agent = random.choice(USER_AGENTS)
+
+    logger.info(
+        "Search attempt %d/%d with engines: %s", attempt + 1, max_retries, engines
+    )
+
+    # Формируем запрос к SearXNG
+    searxng_params = {**_SEARXNG_BASE_PARAMS, "q": query, "engines": engines}
+    # Only add categories for auto-selected engines (smart routing).
+    # When user specifies engines explicitly, omit categories so SearXNG
+    # uses ONLY the specified engines without mixing in category defaults.
+    if not user_engines:
+        searxng_params["categories"] = "general"
+
+    # Рандомизируем заголовки для обхода блокировок
+    headers = {
+        **_RETRY_BASE_HEADERS,
+        "X-Forwarded-For": f"192.168.1.{random.randint(1, 254)}",
+        "X-Real-IP": f"10.0.0.{random.randint(1, 254)}",
+        "User-Agent": user_agent,
+    }
+
+    try:
+        async with session.post(
+            f"{config.searxng_url}/search",
+            data=searxng_params,
+            headers=headers,
+            timeout=_SEARXNG_TIMEOUT,
+        ) as response:
+            if response.status == 200:
+                data = await response.json(loads=orjson.loads)
+                results = data.get("results", [])
+                if results:  # Если есть результаты, возвращаем
+                    logger.info("Search successful on attempt %d", attempt + 1)
+                    return data
+                else:
+                    logger.warning("No results on attempt %d", attempt + 1)
+            else:
+                logger.warning(
+                    "HTTP %s on attempt %d", response.status, attempt + 1
+                )
+
+    except asyncio.TimeoutError:
+        logger.warning("Timeout on attempt %d", attempt + 1)
+    except Exception as e:
+        logger.warning("Error on attempt %d: %s", attempt + 1, e)
+    return None
+
+
+async def _hedged_search(
+    session: aiohttp.ClientSession,
+    query: str,
+    max_retries: int,
+    hedge_delay: float,
+    user_engines: str | None = None,
+) -> dict | None:
+    """Запускает попытки внахлест: следующая стартует через hedge_delay секунд
+    или сразу после неудачи, побеждает первая с результатами"""
+    pending: set[asyncio.Task] = set()
+    attempt = 0
+    try:
+        while attempt < max_retries or pending:
+            if attempt < max_retries and len(pending) < _HEDGE_MAX_IN_FLIGHT:
+                pending.add(
+                    asyncio.create_task(
+                        _search_attempt(
+                            session, query, attempt, max_retries, user_engines
+                        )
+                    )
+                )
+                attempt += 1
+
+            # Ждем ответа не дольше hedge_delay, если можно запустить еще попытку
+            can_hedge = attempt < max_retries and len(pending) < _HEDGE_MAX_IN_FLIGHT
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=hedge_delay if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                data = task.result()
+                if data:
+                    return data
+    finally:
+        # Отменяем оставшиеся попытки, когда победитель уже найден
+        for task in pending:
+            task.cancel()
+    return None
+
+
 async def perform_search_with_retry(
-    query: str, max_results: int, max_retries: int = 3, user_engines: str | None = None
+    session: aiohttp.ClientSession,
+    query: str,
+    max_results: int,
+    max_retries: int = 3,
+    user_engines: str | None = None,
+    hedge_delay: float | None = None,
 ) -> dict:
-    """Выполняет поиск с повторными попытками и разными движками при капче"""
+    """Выполняет поиск с повторными попытками и разными движками при капче.
+
+    Если задан hedge_delay, попытки идут параллельно (не больше двух сразу),
+    иначе строго по очереди со случайной паузой.
+    """
 
     # Expand reddit to use PullPush + OAuth API + Google site:reddit.com
     query, user_engines = _rewrite_reddit_engines(query, user_engines)
     # Trim long queries for GitHub (API returns 0 results for 4+ words)
     query = _trim_query_for_github(query, user_engines)
 
-    for attempt in range(max_retries):
-        # Выбираем движки для текущей попытки
-        if user_engines:
-            # Пользователь указал движки - используем их для всех попыток
-            engines = user_engines
-        elif attempt == 0:
-            # Первая попытка - умный выбор на основе запроса
-            engines = get_smart_engines(query)
-        else:
-            # Последующие попытки - используем fallback список
-            engines = ENGINE_FALLBACKS[(attempt - 1) % len(ENGINE_FALLBACKS)]
-
-        user_agent = random.choice(USER_AGENTS)
-
-        logger.info(
-            f"Search attempt {attempt + 1}/{max_retries} with engines: {engines}"
+    if hedge_delay is not None:
+        data = await _hedged_search(
+            session, query, max_retries, hedge_delay, user_engines
         )
-
-        # Формируем запрос к SearXNG
-        searxng_params = {
-            "q": query,
-            "format": "json",
-            "engines": engines,
-            "pageno": 1,
-            "language": "auto",
-            "safesearch": 1,
-        }
-        # Only add categories for auto-selected engines (smart routing).
-        # When user specifies engines explicitly, omit categories so SearXNG
-        # uses ONLY the specified engines without mixing in category defaults.
-        if not user_engines:
-            searxng_params["categories"] = "general"
-
-        # Рандомизируем заголовки для обхода блокировок
-        headers = {
-            "X-Forwarded-For": f"192.168.1.{random.randint(1, 254)}",
-            "X-Real-IP": f"10.0.0.{random.randint(1, 254)}",
-            "User-Agent": user_agent,
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Accept-Encoding": "gzip, deflate, br",
-            "DNT": "1",
-            "Connection": "keep-alive",
-            "Upgrade-Insecure-Requests": "1",
-            "Sec-Fetch-Dest": "document",
-            "Sec-Fetch-Mode": "navigate",
-            "Sec-Fetch-Site": "none",
-            "Sec-Fetch-User": "?1",
-        }
-
-        try:
+        if data:
+            return data
+    else:
+        for attempt in range(max_retries):
             # Добавляем случайную задержку для имитации человеческого поведения
             if attempt > 0:
                 delay = random.uniform(1, 3)
-                logger.info(f"Waiting {delay:.1f}s before retry...")
+                logger.info("Waiting %.1fs before retry...", delay)
                 await asyncio.sleep(delay)
 
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{config.searxng_url}/search",
-                    data=searxng_params,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=30),
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        results = data.get("results", [])
-                        if results:  # Если есть результаты, возвращаем
-                            logger.info(f"Search successful on attempt {attempt + 1}")
-                            return data
-                        else:
-                            logger.warning(f"No results on attempt {attempt + 1}")
-                    else:
-                        logger.warning(
-                            f"HTTP {response.status} on attempt {attempt + 1}"
-                        )
-
-        except aiohttp.TimeoutError:
-            logger.warning(f"Timeout on attempt {attempt + 1}")
-        except Exception as e:
-            logger.warning(f"Error on attempt {attempt + 1}: {e}")
+            data = await _search_attempt(
+                session, query, attempt, max_retries, user_engines
+            )
+            if data:
+                return data
 
     # Если все попытки провалились, возвращаем пустые результаты
-    logger.error(f"All {max_retries} search attempts failed")
+    logger.error("All %d search attempts failed", max_retries)
     return {"results": []}
 
 
-async def perform_simple_search(query: str, user_engines: str | None = None) -> dict:
+async def perform_simple_search(
+    session: aiohttp.ClientSession, query: str, user_engines: str | None = None
+) -> dict:
     """Простой поиск без anti-captcha логики (старое поведение)"""
 
     # Expand reddit to use PullPush + OAuth API + Google site:reddit.com
@@ -323,121 +565,167 @@ async def perform_simple_search(query: str, user_engines: str | None = None) ->
 
     # Выбираем движки: пользовательские или умный выбор
     engines = user_engines if user_engines else get_smart_engines(query)
-    
-    searxng_params = {
-        "q": query,
-        "format": "json",
-        "engines": engines,
-        "pageno": 1,
-        "language": "auto",
-        "safesearch": 1,
-    }
+
+    searxng_params = {**_SEARXNG_BASE_PARAMS, "q": query, "engines": engines}
     if not user_engines:
         searxng_params["categories"] = "general"
 
-    headers = {
-        "X-Forwarded-For": "127.0.0.1",
-        "X-Real-IP": "127.0.0.1",
-        "User-Agent": "Mozilla/5.0 (compatible; TavilyBot/1.0)",
-        "Content-Type": "application/x-www-form-urlencoded",
-    }
-
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                f"{config.searxng_url}/search",
-                data=searxng_params,
-                headers=headers,
-                timeout=aiohttp.ClientTimeout(total=30),
-            ) as response:
-                if response.status != 200:
-                    raise HTTPException(
-                        status_code=500, detail="SearXNG request failed"
-                    )
-                return await response.json()
-    except aiohttp.TimeoutError:
+        async with session.post(
+            f"{config.searxng_url}/search",
+            data=searxng_params,
+            headers=_SIMPLE_SEARCH_HEADERS,
+            timeout=_SEARXNG_TIMEOUT,
+        ) as response:
+            if response.status != 200:
+                raise HTTPException(
+                    status_code=500, detail="SearXNG request failed"
+                )
+            return await response.json(loads=orjson.loads)
+    except asyncio.TimeoutError:
         raise HTTPException(status_code=504, detail="SearXNG timeout")
     except Exception as e:
-        logger.error(f"SearXNG error: {e}")
+        logger.error("SearXNG error: %s", e)
         raise HTTPException(status_code=500, detail="Search service unavailable")
 
 
-@app.post("/search")
-async def search(request: SearchRequest) -> dict[str, Any]:
+@app.post("/search", response_model=TavilyResponse)
+async def search(request: SearchRequest) -> ORJSONResponse:
     """
     Tavily-compatible search endpoint
     """
     start_time = time.time()
-    request_id = str(uuid.uuid4())
+    request_id = secrets.token_hex(16)
+
+    logger.info("Search request: %s", request.query)
+
+    cache_key = (
+        request.query,
+        request.max_results,
+        request.include_raw_content,
+        request.content_format,
+        request.engines,
+    )
+    payload = response_cache.get(cache_key)
+    if payload is not None:
+        cache_hit = True
+    else:
+
+        async def _search_and_cache() -> tuple[dict[str, Any], bool]:
+            payload, cache_hit = await _run_search(request)
+            results = payload["results"]
+            # Если raw_content запрошен, но часть страниц не скачалась
+            # (таймаут, ошибка), ответ не кэшируем - следующий запрос повторит скрапинг
+            complete = not request.include_raw_content or all(
+                r["raw_content"] for r in results
+            )
+            if results and complete:
+                response_cache.set(cache_key, payload)
+            return payload, cache_hit
+
+        payload, cache_hit = await _search_flight.do(cache_key, _search_and_cache)
+
+    response_time = time.time() - start_time
+
+    logger.info(
+        "Search completed: %d results in %.2fs", len(payload["results"]), response_time
+    )
+    # stats() считается только если debug-лог действительно включен
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Cache stats: response=%s search=%s scrape=%s",
+            response_cache.stats(),
+            search_cache.stats(),
+            scrape_cache.stats(),
+        )
+
+    # Отдаем ORJSONResponse напрямую: FastAPI не прогоняет большой ответ с
+    # raw_content через валидацию response_model и jsonable_encoder
+    return ORJSONResponse(
+        {**payload, "response_time": response_time, "request_id": request_id},
+        headers={"X-Cache": "HIT" if cache_hit else "MISS"},
+    )
 
-    logger.info(f"Search request: {request.query}")
 
+async def _run_search(request: SearchRequest) -> tuple[dict[str, Any], bool]:
+    """Поиск в SearXNG и скрапинг.
+
+    Возвращает ответ без request_id и response_time и признак того,
+    что данные SearXNG взяты из кэша.
+    """
     # Выполняем поиск с retry логикой и обходом капчи
     max_retries = int(os.getenv("MAX_SEARCH_RETRIES", "3"))
     enable_anti_captcha = os.getenv("ENABLE_ANTI_CAPTCHA", "true").lower() == "true"
+    # Параллельные (hedged) попытки: следующая стартует через HEDGE_DELAY секунд
+    enable_hedged = os.getenv("ENABLE_HEDGED_RETRIES", "false").lower() == "true"
+    hedge_delay = float(os.getenv("HEDGE_DELAY", "2.0")) if enable_hedged else None
+
+    # Ответ SearXNG не зависит от max_results, поэтому в ключе его нет
+    cache_key = (request.query, request.engines)
+    searxng_data = search_cache.get(cache_key)
+
+    searxng_cache_hit = searxng_data is not None
+    if not searxng_cache_hit:
+        if enable_anti_captcha:
+            searxng_data = await perform_search_with_retry(
+                app.state.searxng_session,
+                request.query,
+                request.max_results,
+                max_retries,
+                request.engines,
+                hedge_delay,
+            )
+        else:
+            # Простой поиск без retry (старое поведение)
+            searxng_data = await perform_simple_search(
+                app.state.searxng_session, request.query, request.engines
+            )
+        # Пустые ответы (все попытки провалились) не кэшируем
+        if searxng_data.get("results"):
+            search_cache.set(cache_key, searxng_data)
 
-    if enable_anti_captcha:
-        searxng_data = await perform_search_with_retry(
-            request.query, request.max_results, max_retries, request.engines
-        )
-    else:
-        # Простой поиск без retry (старое поведение)
-        searxng_data = await perform_simple_search(request.query, request.engines)
-
-    # Конвертируем результаты в формат Tavily
-    results = []
-    searxng_results = searxng_data.get("results", [])
+    # Результаты без URL отбрасываем сразу, чтобы скор шел без пропусков
+    searxng_results = [
+        r for r in searxng_data.get("results", [])[: request.max_results] if r.get("url")
+    ]
 
     # Если нужен raw_content, скрапим страницы
     raw_contents = {}
     if request.include_raw_content and searxng_results:
-        urls_to_scrape = [
-            r["url"] for r in searxng_results[: request.max_results] if r.get("url")
-        ]
-
-        async with aiohttp.ClientSession() as scrape_session:
-            tasks = [
-                fetch_raw_content(scrape_session, url, request.content_format)
-                for url in urls_to_scrape
-            ]
-            page_contents = await asyncio.gather(*tasks, return_exceptions=True)
-
-            for url, content in zip(urls_to_scrape, page_contents):
-                if isinstance(content, str) and content:
-                    raw_contents[url] = content
+        # Одна и та же страница может прийти от нескольких движков - скрапим ее один раз
+        urls_to_scrape = list(dict.fromkeys(r["url"] for r in searxng_results))
 
-    for i, result in enumerate(searxng_results[: request.max_results]):
-        if not result.get("url"):
-            continue
+        tasks = [
+            fetch_raw_content(app.state.scrape_session, url, request.content_format)
+            for url in urls_to_scrape
+        ]
+        page_contents = await asyncio.gather(*tasks, return_exceptions=True)
 
-        raw_content = None
-        if request.include_raw_content:
-            raw_content = raw_contents.get(result["url"])
+        for url, content in zip(urls_to_scrape, page_contents):
+            if isinstance(content, str) and content:
+                raw_contents[url] = content
 
-        tavily_result = TavilyResult(
-            url=result["url"],
-            title=result.get("title", ""),
-            content=result.get("content", ""),
+    # Конвертируем результаты в формат Tavily
+    results = [
+        TavilyResult(
+            url=r["url"],
+            title=r.get("title", ""),
+            content=r.get("content", ""),
             score=0.9 - (i * 0.05),  # Простая имитация скора
-            raw_content=raw_content,
+            raw_content=raw_contents.get(r["url"]),
         )
-        results.append(tavily_result)
-
-    response_time = time.time() - start_time
-
-    response = TavilyResponse(
-        query=request.query,
-        follow_up_questions=None,
-        answer=None,
-        images=[],
-        results=results,
-        response_time=response_time,
-        request_id=request_id,
-    )
-
-    logger.info(f"Search completed: {len(results)} results in {response_time:.2f}s")
-
-    return response.model_dump()
+        for i, r in enumerate(searxng_results)
+    ]
+
+    # Конверт собираем обычным dict, результаты сериализует pydantic-core за один вызов
+    payload = {
+        "query": request.query,
+        "follow_up_questions": None,
+        "answer": None,
+        "images": [],
+        "results": _results_adapter.dump_python(results),
+    }
+    return payload, searxng_cache_hit
 
 
 class TranscriptRequest(BaseModel):
@@ -446,32 +734,37 @@ class TranscriptRequest(BaseModel):
     max_length: int = 5000
 
 
+@lru_cache(maxsize=1024)
+def _fetch_transcript(video_id: str, languages: tuple[str, ...]):
+    """Загружает субтитры видео; успешные ответы кэшируются"""
+    return YouTubeTranscriptApi().fetch(video_id, languages=languages)
+
+
 @app.post("/transcript")
 async def transcript(request: TranscriptRequest) -> dict[str, Any]:
     """
     Extract YouTube video transcript/subtitles via youtube-transcript-api.
     Returns plain text transcript (auto-generated or manual captions).
     """
-    try:
-        from youtube_transcript_api import YouTubeTranscriptApi
-    except ImportError:
+    if YouTubeTranscriptApi is None:
         raise HTTPException(status_code=500, detail="youtube-transcript-api not installed")
 
     # Extract video ID from URL if needed
     video_id = request.video_id
     if "youtube.com" in video_id or "youtu.be" in video_id:
-        import re
-        match = re.search(r"(?:v=|youtu\.be/)([a-zA-Z0-9_-]{11})", video_id)
+        match = _YOUTUBE_ID_RE.search(video_id)
         if match:
             video_id = match.group(1)
         else:
             raise HTTPException(status_code=400, detail="Invalid YouTube URL")
 
-    logger.info(f"Transcript request: {video_id}")
+    logger.info("Transcript request: %s", video_id)
 
     try:
-        api = YouTubeTranscriptApi()
-        fetched = api.fetch(video_id, languages=request.languages)
+        # Библиотека делает блокирующие HTTP запросы, поэтому уходим в поток
+        fetched = await asyncio.to_thread(
+            _fetch_transcript, video_id, tuple(request.languages)
+        )
         text = " ".join([s.text for s in fetched.snippets])
 
         if len(text) > request.max_length:
@@ -485,7 +778,7 @@ async def transcript(request: TranscriptRequest) -> dict[str, Any]:
             "char_count": len(text),
         }
     except Exception as e:
-        logger.warning(f"Transcript error for {video_id}: {e}")
+        logger.warning("Transcript error for %s: %s", video_id, e)
         raise HTTPException(
             status_code=404,
             detail=f"Transcript not available: {type(e).__name__}",
@@ -495,10 +788,42 @@ async def transcript(request: TranscriptRequest) -> dict[str, Any]:
 @app.get("/health")
 async def health():
     """Health check endpoint"""
-    return {"status": "ok", "service": "searxng-tavily-adapter"}
+    return {
+        "status": "ok",
+        "service": "searxng-tavily-adapter",
+        "cache": {
+            "response": response_cache.stats(),
+            "search": search_cache.stats(),
+            "scrape": scrape_cache.stats(),
+        },
+    }
 
 
-if __name__ == "__main__":
+def main():
+    """Запуск сервера: uvloop + httptools, без access-лога на горячем пути.
+
+    Собственные логи uvicorn - только warning и выше; логи адаптера
+    настраиваются отдельно через logging.basicConfig.
+
+    Число воркеров берется из WEB_CONCURRENCY. Кэши и блокировки живут в
+    процессе, поэтому у каждого воркера они свои.
+    """
     import uvicorn
 
-    uvicorn.run(app, host=config.server_host, port=config.server_port)
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    uvicorn.run(
+        # Строка импорта нужна только воркерам; с одним процессом отдаем уже
+        # созданное приложение, иначе модуль импортируется второй раз как "main"
+        "main:app" if workers > 1 else app,
+        host=config.server_host,
+        port=config.server_port,
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+        access_log=False,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
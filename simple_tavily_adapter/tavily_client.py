@@ -4,16 +4,42 @@ Provides same interface as tavily-python package but uses SearXNG backend
 """
 
 import asyncio
+import secrets
 import time
-import uuid
 from typing import Any
 
 import aiohttp
+import orjson
 from bs4 import BeautifulSoup
 from pydantic import BaseModel
 
 from config_loader import config
 from engine_selector import get_smart_engines
+from http_utils import read_capped_text
+
+# Статичная часть запроса к SearXNG, собирается один раз при импорте
+_SEARXNG_BASE_PARAMS = {
+    "format": "json",
+    "pageno": 1,
+    "language": "auto",
+    "safesearch": 1,
+}
+_SEARXNG_HEADERS = {
+    "X-Forwarded-For": "127.0.0.1",
+    "X-Real-IP": "127.0.0.1",
+    "User-Agent": "Mozilla/5.0 (compatible; TavilyBot/1.0)",
+    "Content-Type": "application/x-www-form-urlencoded",
+    "Accept-Encoding": "gzip, deflate, br",
+}
+_SEARXNG_TIMEOUT = aiohttp.ClientTimeout(total=30)
+
+# Просим сжатие и только HTML: меньше байт по сети, бинарные ответы не нужны
+_SCRAPE_HEADERS = {
+    "User-Agent": config.scraper_user_agent,
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Encoding": "gzip, deflate, br",
+}
+_SCRAPE_TIMEOUT = aiohttp.ClientTimeout(total=config.scraper_timeout)
 
 
 class TavilyResult(BaseModel):
@@ -46,14 +72,18 @@ class TavilyClient:
         try:
             async with session.get(
                 url,
-                timeout=aiohttp.ClientTimeout(total=config.scraper_timeout),
-                headers={"User-Agent": config.scraper_user_agent},
+                timeout=_SCRAPE_TIMEOUT,
+                headers=_SCRAPE_HEADERS,
             ) as response:
                 if response.status != 200:
                     return None
 
-                html = await response.text()
-                soup = BeautifulSoup(html, "html.parser")
+                # Огромные страницы пропускаем
+                html = await read_capped_text(response, config.scraper_max_bytes)
+                if html is None:
+                    return None
+
+                soup = BeautifulSoup(html, "lxml")
 
                 # Удаляем ненужное
                 for tag in soup(
@@ -106,7 +136,7 @@ class TavilyClient:
         engines: str | None = None,
     ) -> dict[str, Any]:
         start_time = time.time()
-        request_id = str(uuid.uuid4())
+        request_id = secrets.token_hex(16)
 
         # Выбираем движки: переданные пользователем или умный выбор
         user_specified = engines is not None
@@ -114,36 +144,23 @@ class TavilyClient:
             engines = get_smart_engines(query)
 
         # Формируем запрос к SearXNG
-        searxng_params = {
-            "q": query,
-            "format": "json",
-            "engines": engines,
-            "pageno": 1,
-            "language": "auto",
-            "safesearch": 1,
-        }
+        searxng_params = {**_SEARXNG_BASE_PARAMS, "q": query, "engines": engines}
         if not user_specified:
             searxng_params["categories"] = "general"
 
         # Убрали обработку доменов - не нужно для упрощенного API
 
-        # Добавляем заголовки для обхода блокировки SearXNG
-        headers = {
-            "X-Forwarded-For": "127.0.0.1",
-            "X-Real-IP": "127.0.0.1",
-            "User-Agent": "Mozilla/5.0 (compatible; TavilyBot/1.0)",
-            "Content-Type": "application/x-www-form-urlencoded",
-        }
-
+        # Одна сессия на весь вызов: SearXNG и скрапинг делят пул соединений
         async with aiohttp.ClientSession() as session:
             try:
                 async with session.post(
                     f"{self.searxng_url}/search",
                     data=searxng_params,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=30),
+                    # Заголовки для обхода блокировки SearXNG
+                    headers=_SEARXNG_HEADERS,
+                    timeout=_SEARXNG_TIMEOUT,
                 ) as response:
-                    searxng_data = await response.json()
+                    searxng_data = await response.json(loads=orjson.loads)
             except Exception as e:
                 # Возвращаем пустой результат в случае ошибки
                 return TavilyResponse(
@@ -153,21 +170,18 @@ class TavilyClient:
                     request_id=request_id,
                 ).model_dump()
 
-        # Конвертируем результаты SearXNG в формат Tavily
-        results = []
-        searxng_results = searxng_data.get("results", [])
-
-        # Если нужен raw_content, скрапим страницы
-        raw_contents = {}
-        if include_raw_content and searxng_results:
-            urls_to_scrape = [
-                r["url"] for r in searxng_results[:max_results] if r.get("url")
+            # Результаты без URL отбрасываем сразу, чтобы скор шел без пропусков
+            searxng_results = [
+                r for r in searxng_data.get("results", [])[:max_results] if r.get("url")
             ]
 
-            async with aiohttp.ClientSession() as scrape_session:
+            # Если нужен raw_content, скрапим страницы
+            raw_contents = {}
+            if include_raw_content and searxng_results:
+                urls_to_scrape = [r["url"] for r in searxng_results]
+
                 tasks = [
-                    self._fetch_raw_content(scrape_session, url)
-                    for url in urls_to_scrape
+                    self._fetch_raw_content(session, url) for url in urls_to_scrape
                 ]
                 page_contents = await asyncio.gather(*tasks, return_exceptions=True)
 
@@ -175,22 +189,17 @@ class TavilyClient:
                     if isinstance(content, str) and content:
                         raw_contents[url] = content
 
-        for i, result in enumerate(searxng_results[:max_results]):
-            if not result.get("url"):
-                continue
-
-            raw_content = None
-            if include_raw_content:
-                raw_content = raw_contents.get(result["url"])
-
-            tavily_result = TavilyResult(
-                url=result["url"],
-                title=result.get("title", ""),
-                content=result.get("content", ""),
+        # Конвертируем результаты SearXNG в формат Tavily
+        results = [
+            TavilyResult(
+                url=r["url"],
+                title=r.get("title", ""),
+                content=r.get("content", ""),
                 score=0.9 - (i * 0.05),  # Простая имитация скора
-                raw_content=raw_content,
+                raw_content=raw_contents.get(r["url"]),
             )
-            results.append(tavily_result)
+            for i, r in enumerate(searxng_results)
+        ]
 
         response_time = time.time() - start_time
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Unit тесты для TTLCache
+"""
+import asyncio
+import time
+
+from cache import KeyedSemaphore, SingleFlight, TTLCache
+
+
+def test_get_set():
+    """Тест сохранения и чтения значения"""
+    cache = TTLCache(maxsize=10, ttl=60)
+    assert cache.get("missing") is None
+    cache.set("key", {"results": [1]})
+    assert cache.get("key") == {"results": [1]}
+    assert len(cache) == 1
+
+
+def test_lru_eviction():
+    """Тест вытеснения самого старого по использованию элемента"""
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "a" теперь самый свежий
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_expiry():
+    """Тест истечения TTL"""
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+    time.sleep(0.1)
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_disabled_cache():
+    """Тест что maxsize=0 или ttl=0 отключают кэш"""
+    for cache in (TTLCache(maxsize=0, ttl=60), TTLCache(maxsize=10, ttl=0)):
+        cache.set("key", "value")
+        assert cache.get("key") is None
+
+
+def test_stats():
+    """Тест счетчиков попаданий и промахов"""
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.get("key")
+    cache.set("key", "value")
+    cache.get("key")
+    cache.get("key")
+    assert cache.stats() == {"size": 1, "hits": 2, "misses": 1, "hit_rate": 0.667}
+
+
+def test_single_flight():
+    """Тест что одновременные вызовы с одним ключом выполняются один раз"""
+    flight = SingleFlight()
+    calls = {"a": 0, "b": 0}
+
+    async def work(key):
+        calls[key] += 1
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def run():
+        return await asyncio.gather(
+            *(flight.do(k, lambda k=k: work(k)) for k in "aaabb")
+        )
+
+    assert asyncio.run(run()) == ["A", "A", "A", "B", "B"]
+    assert calls == {"a": 1, "b": 1}
+    assert len(flight) == 0
+
+
+def test_single_flight_error():
+    """Тест что ошибку общего вызова получают все ожидающие"""
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(
+            *(flight.do("key", fail) for _ in range(3)), return_exceptions=True
+        )
+
+    errors = asyncio.run(run())
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert len(flight) == 0
+
+
+def test_keyed_semaphore():
+    """Тест лимита на ключ: ключи независимы, пустые записи удаляются"""
+    limit = KeyedSemaphore(2)
+    active: dict[str, int] = {"a": 0, "b": 0}
+    peak: dict[str, int] = {"a": 0, "b": 0}
+
+    async def worker(key):
+        async with limit.hold(key):
+            active[key] += 1
+            peak[key] = max(peak[key], active[key])
+            await asyncio.sleep(0.01)
+            active[key] -= 1
+
+    async def run():
+        await asyncio.gather(*(worker("a") for _ in range(5)), worker("b"))
+
+    asyncio.run(run())
+    assert peak == {"a": 2, "b": 1}
+    assert len(limit) == 0
+
+
+if __name__ == "__main__":
+    test_get_set()
+    test_lru_eviction()
+    test_ttl_expiry()
+    test_disabled_cache()
+    test_stats()
+    test_single_flight()
+    test_single_flight_error()
+    test_keyed_semaphore()
+    print("🎉 Все тесты кэша прошли!")
@@ -2,6 +2,7 @@
 """
 Тест умного выбора движков
 """
+import engine_selector
 from engine_selector import get_smart_engines
 
 def test_smart_engine_selection():
@@ -62,5 +63,44 @@ def test_smart_engine_selection():
     
     print("✅ Все приоритеты работают корректно!")
 
+def test_regex_fallback_scores():
+    """Тест что regex-фоллбэк без pyahocorasick считает так же, как подсчет подстрок"""
+    queries = [
+        "swiftui app for ios",         # swift спрятан внутри swiftui
+        "google go tutorial",          # go внутри google
+        "Python  Programming CODE",    # регистр и лишние пробелы
+        "research paper on llm architecture and llm",
+        "что такое нейросеть и модели",
+        "best pizza recipe",
+        "",
+    ]
+    saved = engine_selector._AC, engine_selector._CAT_RE
+    try:
+        engine_selector._AC = None
+        engine_selector._CAT_RE = engine_selector._build_category_regexes()
+        engine_selector._smart_engines_cached.cache_clear()
+        for query in queries:
+            norm_query = " ".join(query.lower().split())
+            # Исходный алгоритм: число ключевых слов категории, входящих в запрос
+            expected = [
+                sum(1 for kw in keywords if kw in norm_query)
+                for _cat, (keywords, _engines) in engine_selector._CATS_LIST
+            ]
+            assert engine_selector._category_scores(norm_query) == expected, query
+
+            best_score = max(expected)
+            expected_engines = (
+                engine_selector._CATS_LIST[expected.index(best_score)][1][1]
+                if best_score
+                else engine_selector.ENGINES_GENERAL
+            )
+            assert get_smart_engines(query) == expected_engines, query
+    finally:
+        engine_selector._AC, engine_selector._CAT_RE = saved
+        engine_selector._smart_engines_cached.cache_clear()
+
+    print("✅ Regex-фоллбэк совпадает с подсчетом подстрок!")
+
 if __name__ == "__main__":
-    test_smart_engine_selection()
\ No newline at end of file
+    test_smart_engine_selection()
+    test_regex_fallback_scores()
\ No newline at end of file
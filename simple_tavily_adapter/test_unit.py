@@ -2,8 +2,19 @@
 """
 Unit тесты для адаптера
 """
+import asyncio
+import time
+from unittest.mock import PropertyMock, patch
+
+import aiohttp
+import lxml.html
 import pytest
-from main import SearchRequest
+from aiohttp import web
+import main
+from cache import KeyedSemaphore
+from config_loader import config
+from http_utils import read_capped_text, resolve_charset
+from main import SearchRequest, _extract_capped, _extract_content
 
 def test_search_request_defaults():
     """Тест дефолтных значений SearchRequest"""
@@ -50,9 +61,222 @@ def test_markdown_default():
     
     print("✅ Все unit тесты прошли!")
 
+def test_resolve_charset():
+    """Тест что неизвестная кодировка из Content-Type заменяется на utf-8"""
+    assert resolve_charset("windows-1251") == "cp1251"
+    assert resolve_charset("UTF8") == "utf-8"
+    assert resolve_charset("utf8mb4") == "utf-8"
+    assert resolve_charset(None) == "utf-8"
+
+class _FakeBody:
+    """Тело ответа, отдаваемое кусками"""
+    def __init__(self, data):
+        self.data = data
+        self.read = 0
+
+    async def iter_chunked(self, size):
+        for i in range(0, len(self.data), size):
+            self.read += size
+            yield self.data[i:i + size]
+
+class _FakeResponse:
+    def __init__(self, data, charset=None, content_length=None):
+        self.content = _FakeBody(data)
+        self.charset = charset
+        self.content_length = content_length
+
+def test_read_capped_text():
+    """Тест чтения тела с лимитом: пропуск по Content-Length, иначе обрезка"""
+    text = "Привет".encode("cp1251")
+    resp = _FakeResponse(text, charset="windows-1251", content_length=len(text))
+    assert asyncio.run(read_capped_text(resp, 100)) == "Привет"
+
+    # Content-Length больше лимита - тело даже не читается
+    resp = _FakeResponse(b"x" * 200, content_length=200)
+    assert asyncio.run(read_capped_text(resp, 100)) is None
+    assert resp.content.read == 0
+
+    # Без Content-Length тело обрезается на лимите, остаток не дочитывается
+    resp = _FakeResponse(b"x" * 500_000)
+    assert asyncio.run(read_capped_text(resp, 100_000)) == "x" * 100_000
+    assert resp.content.read < 500_000
+
+_PAGE_HTML = """<html><head><title>Title</title><script>var secret = 1;</script>
+<style>p { color: red }</style></head><body>
+<header>HEADER</header><nav>NAV</nav>
+<p>Hello <b>world</b></p>
+<aside>ASIDE</aside><iframe>IFRAME</iframe><footer>FOOTER</footer>
+</body></html>"""
+
+def test_extract_content_drops_boilerplate():
+    """Тест что script/style/header/nav/aside/footer вырезаются в обоих форматах"""
+    for content_format in ("text", "markdown"):
+        text = _extract_content(_PAGE_HTML, content_format)
+        assert "Hello" in text and "world" in text, content_format
+        for dropped in ("secret", "color", "HEADER", "NAV", "ASIDE", "IFRAME", "FOOTER"):
+            assert dropped not in text, (content_format, dropped)
+    assert "**world**" in _extract_content(_PAGE_HTML, "markdown")
+
+def test_extract_content_declared_encoding():
+    """Тест что объявленная в документе кодировка не ломает уже декодированный текст"""
+    html = (
+        '<?xml version="1.0" encoding="windows-1251"?>'
+        '<html><head><meta charset="windows-1251"></head>'
+        "<body><p>Привет, мир</p></body></html>"
+    )
+    for content_format in ("text", "markdown"):
+        assert _extract_content(html, content_format) == "Привет, мир", content_format
+
+def test_extract_content_truncation():
+    """Тест обрезки до scraper_max_length с "..." и ранней остановки сбора текста"""
+    html = "<html><body>" + "<p>word</p>" * 1000 + "</body></html>"
+    with patch.object(
+        type(config), "scraper_max_length", new_callable=PropertyMock, return_value=50
+    ):
+        for content_format in ("text", "markdown"):
+            text = _extract_content(html, content_format)
+            assert len(text) == 53 and text.endswith("..."), content_format
+
+    # Сбор текста останавливается сразу после лимита, а не идет до конца документа
+    tree = lxml.html.fromstring(html)
+    assert 50 < len(_extract_capped(tree, 50)) <= 50 + len(" word")
+
+def test_extract_content_empty():
+    """Тест что страница без текста дает None в обоих форматах"""
+    for html in ("", "   ", "<html><body></body></html>"):
+        for content_format in ("text", "markdown"):
+            assert _extract_content(html, content_format) is None, (html, content_format)
+
+def test_fetch_raw_content_same_host():
+    """Тест что очередь к одному хосту не съедает таймаут и не держит общие слоты"""
+    active = {"n": 0, "peak": 0}
+
+    async def page(request):
+        active["n"] += 1
+        active["peak"] = max(active["peak"], active["n"])
+        try:
+            await asyncio.sleep(0.3)
+        finally:
+            active["n"] -= 1
+        return web.Response(
+            text=f"<html><body><p>page {request.match_info['n']}</p></body></html>",
+            content_type="text/html",
+        )
+
+    async def other_page(request):
+        return web.Response(text="<p>other</p>", content_type="text/html")
+
+    async def run():
+        server = web.Application()
+        server.router.add_get("/same/{n}", page)
+        server.router.add_get("/other", other_page)
+        runner = web.AppRunner(server)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            async with aiohttp.ClientSession() as session:
+                # 6 страниц по 0.3с при лимите 2 на хост и таймауте 0.5с
+                same_host = [
+                    asyncio.create_task(main.fetch_raw_content(
+                        session, f"http://127.0.0.1:{port}/same/{i}"
+                    ))
+                    for i in range(6)
+                ]
+                await asyncio.sleep(0.05)
+                # Другой хост не ждет, пока разойдется очередь к первому
+                start = time.monotonic()
+                other = await main.fetch_raw_content(session, f"http://localhost:{port}/other")
+                other_elapsed = time.monotonic() - start
+                return await asyncio.gather(*same_host), other, other_elapsed
+        finally:
+            await runner.cleanup()
+
+    with patch.object(main, "_SCRAPE_TIMEOUT", aiohttp.ClientTimeout(total=0.5)), \
+            patch.object(main, "_scrape_host_limit", KeyedSemaphore(2)), \
+            patch.object(main, "_scrape_semaphore", asyncio.Semaphore(3)):
+        main.scrape_cache.clear()
+        pages, other, other_elapsed = asyncio.run(run())
+        main.scrape_cache.clear()
+
+    assert pages == [f"page {i}" for i in range(6)]
+    assert active["peak"] == 2
+    assert other == "other"
+    assert other_elapsed < 0.25
+
+def _run_hedged(plan, max_retries, hedge_delay):
+    """Запускает _hedged_search с заглушкой _search_attempt.
+
+    plan[attempt] = (задержка, результат). Возвращает результат поиска,
+    время старта каждой попытки, максимум одновременных попыток и отмененные.
+    """
+    started, cancelled = {}, set()
+    in_flight = [0, 0]  # сейчас, максимум
+
+    async def fake_attempt(session, query, attempt, max_retries, user_engines):
+        started[attempt] = time.monotonic() - t0
+        in_flight[0] += 1
+        in_flight[1] = max(in_flight[1], in_flight[0])
+        delay, result = plan[attempt]
+        try:
+            await asyncio.sleep(delay)
+            return result
+        except asyncio.CancelledError:
+            cancelled.add(attempt)
+            raise
+        finally:
+            in_flight[0] -= 1
+
+    async def run():
+        data = await main._hedged_search(None, "q", max_retries, hedge_delay)
+        await asyncio.sleep(0)  # даем отмененным задачам завершиться
+        return data
+
+    with patch.object(main, "_search_attempt", fake_attempt):
+        t0 = time.monotonic()
+        data = asyncio.run(run())
+    return data, started, in_flight[1], cancelled
+
+def test_hedged_search_stagger_and_cancel():
+    """Тест что вторая попытка стартует через hedge_delay, а проигравшая отменяется"""
+    plan = {0: (1.0, {"results": ["slow"]}), 1: (0.01, {"results": ["fast"]})}
+    data, started, _, cancelled = _run_hedged(plan, max_retries=2, hedge_delay=0.1)
+    assert data == {"results": ["fast"]}
+    assert 0.08 <= started[1] < 0.5
+    assert cancelled == {0}
+
+def test_hedged_search_immediate_hedge_on_failure():
+    """Тест что после неудачи следующая попытка стартует сразу, не дожидаясь hedge_delay"""
+    plan = {0: (0.0, None), 1: (0.0, {"results": ["ok"]})}
+    data, started, _, _ = _run_hedged(plan, max_retries=3, hedge_delay=5.0)
+    assert data == {"results": ["ok"]}
+    assert started[1] < 0.5
+    assert 2 not in started
+
+def test_hedged_search_in_flight_cap():
+    """Тест что одновременно выполняется не больше двух попыток"""
+    plan = {i: (0.1, None) for i in range(4)}
+    data, started, max_in_flight, _ = _run_hedged(plan, max_retries=4, hedge_delay=0.01)
+    assert data is None
+    assert sorted(started) == [0, 1, 2, 3]
+    assert max_in_flight == main._HEDGE_MAX_IN_FLIGHT == 2
+    # Третья попытка ждет, пока освободится место
+    assert started[2] >= 0.09
+
 if __name__ == "__main__":
     test_search_request_defaults()
     test_search_request_custom() 
     test_content_format_validation()
     test_markdown_default()
+    test_resolve_charset()
+    test_read_capped_text()
+    test_extract_content_drops_boilerplate()
+    test_extract_content_declared_encoding()
+    test_extract_content_truncation()
+    test_extract_content_empty()
+    test_fetch_raw_content_same_host()
+    test_hedged_search_stagger_and_cancel()
+    test_hedged_search_immediate_hedge_on_failure()
+    test_hedged_search_in_flight_cap()
     print("🎉 Все тесты успешно завершены!")
\ No newline at end of file